@@ -1,16 +1,55 @@
+import atexit
+import os
 import sys
-import pytesseract
+import tesserocr
+from functools import lru_cache
+from PIL import Image
 from pathlib import Path
 from preprocessor import preprocess_image
 from parser import parse_attendance_data
 from reporter import generate_report
 
-def main(image_path: str = None):
-    # Setup paths and Tesseract
+TESSDATA_PATH = "C:/Program Files (x86)/Tesseract-OCR/tessdata"
+
+
+@lru_cache(maxsize=1)
+def _get_api():
+    """Tesseract in-process (libtesseract via tesserocr), criado no primeiro OCR e reaproveitado entre imagens.
+
+    Uma única instância, com o modelo de idioma já carregado, em vez de um subprocesso por chamada.
+    Usa TESSDATA_PATH se existir; senão, o tessdata padrão da instalação do tesserocr.
+    Configurado para conteúdo tabular (equivalente a --psm 6 --oem 3 -c preserve_interword_spaces=1).
+    """
+    kwargs = {'path': TESSDATA_PATH} if os.path.isdir(TESSDATA_PATH) else {}
+    api = tesserocr.PyTessBaseAPI(lang='por+eng', psm=tesserocr.PSM.SINGLE_BLOCK,
+                                  oem=tesserocr.OEM.DEFAULT, **kwargs)
+    api.SetVariable('preserve_interword_spaces', '1')
+    atexit.register(api.End)
+    return api
+
+
+def ocr_image(proc, psm: int = tesserocr.PSM.SINGLE_BLOCK) -> str:
+    """Executa o OCR na imagem pré-processada (array numpy) usando a instância compartilhada.
+
+    `psm` escolhe a segmentação de página:
+    - PSM.SINGLE_BLOCK (6): folhas escaneadas limpas, texto em bloco/tabela (padrão)
+    - PSM.SPARSE_TEXT (11): fotos de folhas com texto esparso/desalinhado; mais lento em folhas limpas
+    """
+    api = _get_api()
+    api.SetPageSegMode(psm)
+    api.SetImage(Image.fromarray(proc))
+    return api.GetUTF8Text()
+
+
+def main(image_path: str = None, psm: int = tesserocr.PSM.SINGLE_BLOCK):
+    """Processa uma imagem de folha de presença e gera o relatório.
+
+    Uso: python main.py [imagem] [psm]  (psm 6 para folhas escaneadas, 11 para fotos; ver `ocr_image`)
+    """
+    # Setup paths
     base = Path(__file__).resolve().parent
     default_image = base.parent.joinpath('../', 'BEST.png')
     img_path = Path(image_path) if image_path else default_image
-    pytesseract.pytesseract.tesseract_cmd = "C:/Program Files (x86)/Tesseract-OCR/tesseract.exe"
 
     if not img_path.exists():
         print(f"Arquivo não encontrado: {img_path}")
@@ -22,9 +61,7 @@ def main(image_path: str = None):
         print(f"Erro ao processar imagem: {e}")
         sys.exit(1)
 
-    # Configure Tesseract for table-like content
-    config = '--psm 6 --oem 3 -c preserve_interword_spaces=1'
-    text = pytesseract.image_to_string(proc, lang='por+eng', config=config)
+    text = ocr_image(proc, psm)
     
     # Parse attendance data
     attendance_data = parse_attendance_data(text)
@@ -34,4 +71,5 @@ def main(image_path: str = None):
 
 if __name__ == "__main__":
     arg = sys.argv[1] if len(sys.argv) > 1 else None
-    main(arg)
\ No newline at end of file
+    psm = int(sys.argv[2]) if len(sys.argv) > 2 else tesserocr.PSM.SINGLE_BLOCK
+    main(arg, psm)
\ No newline at end of file
@@ -1,6 +1,10 @@
 import csv
 import os
-from typing import List, Tuple, Optional
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, List, NamedTuple, Tuple, Optional
+
+import numpy as np
 
 try:
     from rapidfuzz import process, fuzz
@@ -11,13 +15,56 @@ except Exception:
 
 ROSTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'roster.csv')
 
+# Abaixo deste número de nomes o cdist roda numa thread só: subir o pool custa mais que pontuar o lote
+CDIST_PARALLEL_MIN = 64
+
+# Remove os diacríticos combinantes (blocos Unicode de marcas combinantes) que o NFKD separa das letras
+_COMBINING_STRIP = dict.fromkeys(
+    c for lo, hi in ((0x0300, 0x0370), (0x1AB0, 0x1B00), (0x1DC0, 0x1E00), (0x20D0, 0x2100), (0xFE20, 0xFE30))
+    for c in range(lo, hi)
+)
+
+
+class Roster(NamedTuple):
+    """Nomes canônicos e o que o matcher usa deles, pré-calculado no carregamento.
+
+    `normalized` (sem acentos, maiúsculas) é a lista de escolhas passada ao rapidfuzz; `lengths` e
+    `initials` são os arrays numpy do pré-filtro e `initial_set` o conjunto das iniciais.
+    """
+    names: Tuple[str, ...]
+    normalized: Tuple[str, ...]
+    lengths: np.ndarray
+    initials: np.ndarray
+    initial_set: FrozenSet[str]
+
+
+@lru_cache(maxsize=4096)
+def remove_accents(s: str) -> str:
+    """Remove acentos (decomposição NFKD sem as marcas combinantes)."""
+    if s.isascii():
+        return s
+    nkfd = unicodedata.normalize('NFKD', s)
+    return nkfd.translate(_COMBINING_STRIP)
 
-def load_roster(path: Optional[str] = None) -> List[str]:
+
+def _normalize(s: str) -> str:
+    return remove_accents(s).upper()
+
+
+def _build_roster(names: List[str]) -> Roster:
+    """Monta o `Roster` a partir dos nomes canônicos."""
+    normalized = tuple(_normalize(n) for n in names)
+    lengths = np.fromiter((len(n) for n in normalized), dtype=np.int64, count=len(normalized))
+    initials = np.array([n[:1] for n in normalized], dtype='<U1')
+    return Roster(tuple(names), normalized, lengths, initials, frozenset(initials.tolist()))
+
+
+def load_roster(path: Optional[str] = None) -> Roster:
     """Carrega nomes canônicos do arquivo roster.csv (coluna canonical_name)."""
     p = path or ROSTER_PATH
     names = []
     if not os.path.exists(p):
-        return names
+        return _build_roster(names)
     with open(p, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
@@ -29,23 +76,93 @@ def load_roster(path: Optional[str] = None) -> List[str]:
                 first = next(iter(row.values()), '').strip()
                 if first:
                     names.append(first)
-    return names
+    return _build_roster(names)
+
+
+def _prefilter(query: str, roster: Roster) -> np.ndarray:
+    """Índices dos nomes do roster com tamanho próximo (±6) e a mesma inicial, via máscara vetorial.
+
+    `query` já deve estar normalizado. Se a inicial não existir no roster (erro de OCR na primeira
+    letra), filtra apenas pelo tamanho.
+    """
+    mask = np.abs(roster.lengths - len(query)) <= 6
+    initial = query[:1]
+    if initial in roster.initial_set:
+        mask &= roster.initials == initial
+    return np.flatnonzero(mask)
+
+
+def _match_prefiltered(query: str, roster: Roster, threshold: int) -> Optional[Tuple[str, float]]:
+    """Primeira etapa comum aos dois matchers: `token_set_ratio` só nos candidatos do pré-filtro.
+
+    O `WRatio` (mais caro) só desempata os 3 melhores. Retorna None se nenhum candidato atingir o threshold.
+    """
+    idxs = _prefilter(query, roster)
+    if not idxs.size:
+        return None
+    top = process.extract(query, [roster.normalized[i] for i in idxs], scorer=fuzz.token_set_ratio,
+                          score_cutoff=threshold, limit=3)
+    if not top:
+        return None
+    _cand, score, k = max(top, key=lambda t: (t[1], fuzz.WRatio(query, t[0])))
+    return roster.names[idxs[k]], float(score)
 
 
-def match_to_roster(name: str, roster: List[str], threshold: int = 85) -> Tuple[Optional[str], Optional[float]]:
+def match_to_roster(name: str, roster: Roster, threshold: int = 85) -> Tuple[Optional[str], Optional[float]]:
     """Retorna (canonical_name, score) se houver match com score >= threshold, senão (None, best_score).
 
+    Os candidatos de tamanho próximo e mesma inicial são pontuados com `token_set_ratio`; se nenhum atingir
+    o threshold (ex.: linha com a coluna de apelido, bem mais longa que o nome do roster), o roster inteiro
+    é pontuado com `WRatio`, que também dá o best_score.
+
     Se `rapidfuzz` não estiver instalado, retorna (None, None) para indicar que a correspondência não foi feita.
     """
-    if not name or not roster:
+    if not name or not roster.names:
         return None, None
     if not HAS_RAPIDFUZZ:
         return None, None
 
-    best = process.extractOne(name, roster, scorer=fuzz.WRatio)
-    if not best:
-        return None, None
-    cand, score, _idx = best
+    query = _normalize(name)
+    hit = _match_prefiltered(query, roster, threshold)
+    if hit:
+        return hit
+
+    _cand, score, idx = process.extractOne(query, roster.normalized, scorer=fuzz.WRatio)
     if score >= threshold:
-        return cand, float(score)
+        return roster.names[idx], float(score)
     return None, float(score)
+
+
+def match_all_to_roster(names: List[str], roster: Roster, threshold: int = 85) -> List[Tuple[Optional[str], Optional[float]]]:
+    """Versão em lote de `match_to_roster`, com o mesmo critério e a mesma semântica.
+
+    Retorna uma lista alinhada com `names`. Os nomes que não passam na primeira etapa são pontuados
+    com `WRatio` contra o roster inteiro numa única chamada a `cdist` (sem `score_cutoff`, já que o
+    best_score também é reportado abaixo do threshold).
+    """
+    if not names:
+        return []
+    if not roster.names or not HAS_RAPIDFUZZ:
+        return [(None, None)] * len(names)
+
+    queries = [_normalize(n) for n in names]
+    results: List[Tuple[Optional[str], Optional[float]]] = [(None, None)] * len(names)
+    pending = []
+    for i, query in enumerate(queries):
+        if not query:
+            continue
+        hit = _match_prefiltered(query, roster, threshold)
+        if hit:
+            results[i] = hit
+        else:
+            pending.append(i)
+
+    if pending:
+        workers = -1 if len(pending) >= CDIST_PARALLEL_MIN else 1
+        scores = process.cdist([queries[i] for i in pending], roster.normalized, scorer=fuzz.WRatio,
+                               workers=workers, dtype=np.float64)
+        for i, row in zip(pending, scores):
+            idx = int(row.argmax())
+            score = float(row[idx])
+            results[i] = (roster.names[idx], score) if score >= threshold else (None, score)
+    return results
@@ -1,16 +1,20 @@
 import re
-import unicodedata
-from collections import Counter
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime
 
-# try to import matcher for roster fuzzy-matching; if not available, we'll skip matching
-try:
-    from matcher import load_roster, match_to_roster
-    ROSTER = load_roster()
-except Exception:
-    ROSTER = []
+# matcher handles the optional rapidfuzz dependency itself; without it roster matching is skipped
+from matcher import load_roster, match_all_to_roster, remove_accents
+
+
+@lru_cache(maxsize=1)
+def _get_roster():
+    """Carrega o roster.csv uma única vez, na primeira vez em que for necessário (None se indisponível)."""
+    try:
+        return load_roster()
+    except Exception:
+        return None
 
 
 # Heurísticas e listas auxiliares para limpar nomes reconhecidos via OCR
@@ -19,13 +23,57 @@ COMMON_ROLES = [
     'FERREIRO', 'AUXILIAR', 'ENCANADOR', 'MARCENEIRO', 'SERVICO',
 ]
 
+# Cargos que marcam o início da seção de cargo numa linha (ver parse_line)
+_ROLE_MARKERS = frozenset({'SERVENTE', 'PEDREIRO', 'PINTOR', 'ELETRICISTA'})
+
 # Lista pequena de primeiros nomes comuns brasileiros para tentar ``descolar'' nomes colados
-COMMON_FIRST_NAMES = [
-    'ADRIANO','ALDENIR','ANDRE','ANTONIO','ANTONIO','CAIO','RAFAEL','COSME','DAMIAO','EMERSON',
+COMMON_FIRST_NAMES = frozenset([
+    'ADRIANO','ALDENIR','ANDRE','ANTONIO','CAIO','RAFAEL','COSME','DAMIAO','EMERSON',
     'FLAVIO','FRANCISCO','JOAO','JOSE','JORGE','LEANDRO','MAICOM','MARCOS','MATHEUS',
     'MICHAEL','PAULO','RAILSON','RENATO','RICARDO','RONALDO','SEBASTIAO','TIAGO','WELLINGTON',
-    'JEFERSON','JEFERSON','JOAQUIM','JONALDO','ISRAEL'
-]
+    'JEFERSON','JOAQUIM','JONALDO','ISRAEL'
+])
+# tamanhos distintos dos primeiros nomes, do maior para o menor (busca do prefixo mais longo)
+_FIRST_NAME_LENGTHS = sorted({len(fn) for fn in COMMON_FIRST_NAMES}, reverse=True)
+
+# Padrões pré-compilados (evita recompilar/consultar o cache do ``re`` a cada linha)
+_TIME_PATTERN = r'\b(?:[01]?\d|2[0-3])[:|lI][0-5]\d\b'
+_LONG_NUM_PATTERN = r'\b\d{2,}\b'
+_ROLES_PATTERN = r'\b(?:' + '|'.join(COMMON_ROLES) + r')\b'
+_STOP_PATTERN = r'\b(?:E|DE|DA|DO|DOS|DAS|O|A)\b'
+# horários, números longos, cargos, conectivos e pontuação removidos numa única passada
+_SCRUB_RE = re.compile(
+    rf'(?P<time>{_TIME_PATTERN})|(?P<num>{_LONG_NUM_PATTERN})|(?P<role>(?i:{_ROLES_PATTERN}))'
+    rf'|(?P<stop>(?i:{_STOP_PATTERN}))|(?P<junk>[^\w\s])'
+)
+_NONWORD_RE = re.compile(r'[^\w\s]')
+_NONALPHA_RE = re.compile(r'[^A-Za-z\s]')
+_WS_RE = re.compile(r'\s+')
+_JOIN_RE = re.compile(r'([A-Z]{3,})([A-Z]{3,})')
+_TIMEPART_RE = re.compile(r'^([0-2]?\d[:.]?[0-5]\d|F)$')
+
+# hyperscan (opcional) varre todos os padrões de uma vez só; sem ele, usa-se _SCRUB_RE
+try:
+    import hyperscan
+    _SCRUB_DB = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    _SOM = hyperscan.HS_FLAG_SOM_LEFTMOST
+    _NOCASE = hyperscan.HS_FLAG_CASELESS
+    _SCRUB_DB.compile(
+        expressions=[p.encode('ascii') for p in
+                     (_TIME_PATTERN, _LONG_NUM_PATTERN, _ROLES_PATTERN, _STOP_PATTERN, r'[^\w\s]')],
+        ids=[0, 1, 2, 3, 4],
+        elements=5,
+        flags=[_SOM, _SOM, _SOM | _NOCASE, _SOM | _NOCASE, _SOM],
+    )
+    HAS_HYPERSCAN = True
+except Exception:
+    HAS_HYPERSCAN = False
+
+# Correções simples observadas em OCR, aplicadas numa única passada com str.translate
+_TRANSLATE_TABLE = str.maketrans({
+    '—': ' ', '–': ' ', '|': ' ', '\\': ' ', '/': ' ', '_': ' ', 'º': ' ', 'ª': ' ',
+    '%': 'A', 'Ã': 'A', 'Í': 'I', 'í': 'i', 'â': 'a', 'ó': 'o', '\ufffd': ' ', '\n': ' ',
+})
 
 
 @dataclass
@@ -37,13 +85,11 @@ class AttendanceEntry:
     afternoon_in: str = ''
     afternoon_out: str = ''
     is_absent: bool = False
+    canonical_name: Optional[str] = None
+    match_score: Optional[float] = None
 
 
-def _remove_accents(s: str) -> str:
-    nkfd = unicodedata.normalize('NFKD', s)
-    return ''.join([c for c in nkfd if not unicodedata.combining(c)])
-
-
+@lru_cache(maxsize=4096)
 def clean_ocr_text(s: str) -> str:
     """Aplica normalizações básicas a uma linha de OCR
 
@@ -55,56 +101,80 @@ def clean_ocr_text(s: str) -> str:
     if not s:
         return s
 
-    # Mapeamento de correções simples observadas em OCR
-    corrections = {
-        '—': ' ', '–': ' ', '|': ' ', '\\': ' ', '/': ' ', '_': ' ', 'º': ' ', 'ª': ' ',
-        '%': 'A', 'Ã': 'A', 'Ãº': 'U', 'Í': 'I', 'í': 'i', 'â': 'a', 'ó': 'o', '�': ' ',"\n": " "
-    }
-
-    out = s
-    for k, v in corrections.items():
-        out = out.replace(k, v)
+    # 'Ãº' (ú mal decodificado) tem dois caracteres e não cabe na tabela de tradução
+    out = s.replace('Ãº', 'U').translate(_TRANSLATE_TABLE)
 
     # Remove sequences of characters that are obviously non-text
-    out = re.sub(r'[\u2018\u2019\u201c\u201d\u00b4\[\]<>\"*#@~]', ' ', out)
-    out = re.sub(r'[-=+~©®]', ' ', out)
-
-    # Collapse repeated non-letter characters
-    out = re.sub(r'[^\w\s]', ' ', out)
+    # (aspas, colchetes, ~, ©, ® etc. também caem nesta classe)
+    out = _NONWORD_RE.sub(' ', out)
 
     # Normalize whitespace
-    out = re.sub(r'\s+', ' ', out).strip()
+    out = _WS_RE.sub(' ', out).strip()
 
     # Normalize accents to help matching
-    out = _remove_accents(out)
+    out = remove_accents(out)
 
     return out
 
 
+def _hs_scrub(line: str) -> str:
+    """Equivalente a ``_SCRUB_RE.sub(' ', line)`` usando o banco hyperscan (apenas para linhas ASCII)."""
+    spans = []
+
+    def on_match(_id, start, end, _flags, _ctx):
+        spans.append((start, end))
+
+    _SCRUB_DB.scan(line.encode('ascii'), match_event_handler=on_match)
+    if not spans:
+        return line
+
+    # hyperscan reporta todos os matches, inclusive sobrepostos (ex.: os números dentro de um horário);
+    # spans que se sobrepõem viram um único espaço, como no match mais à esquerda do ``re``
+    spans.sort()
+    parts = []
+    pos = 0
+    cur_start, cur_end = spans[0]
+    for start, end in spans[1:]:
+        if start < cur_end:
+            cur_end = max(cur_end, end)
+            continue
+        parts.append(line[pos:cur_start])
+        parts.append(' ')
+        pos = cur_end
+        cur_start, cur_end = start, end
+    parts.append(line[pos:cur_start])
+    parts.append(' ')
+    parts.append(line[cur_end:])
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=4096)
 def strip_times_and_roles(line: str) -> str:
     """Remove horários, números, cargos e outras marcações para isolar o nome principal."""
     if not line:
         return line
 
-    # remove padrões de tempo HH:MM e variantes
-    line = re.sub(r'\b(?:[01]?\d|2[0-3])[:|lI][0-5]\d\b', ' ', line)
-    line = re.sub(r'\b(?:[01]?\d|2[0-3])[:][0-5]\d\b', ' ', line)
-
-    # remove números longos, telefones, códigos
-    line = re.sub(r'\b\d{2,}\b', ' ', line)
-
-    # remove palavras de cargos
-    for r in COMMON_ROLES:
-        line = re.sub(rf'\b{r}\b', ' ', line, flags=re.IGNORECASE)
-
-    # remove tokens curtos não relevantes
-    line = re.sub(r'\b(?:E|DE|DA|DO|DOS|DAS|O|A)\b', ' ', line, flags=re.IGNORECASE)
+    # remove horários HH:MM (e variantes), números longos/telefones/códigos, palavras de cargos,
+    # tokens curtos não relevantes e pontuação solta
+    if HAS_HYPERSCAN and line.isascii():
+        line = _hs_scrub(line)
+    else:
+        line = _SCRUB_RE.sub(' ', line)
 
     # collapse spaces
-    line = re.sub(r'\s+', ' ', line).strip()
+    line = _WS_RE.sub(' ', line).strip()
     return line
 
 
+def _first_name_prefix(s: str) -> str:
+    """Retorna o maior primeiro nome conhecido que é prefixo de `s` ('' se nenhum)."""
+    for n in _FIRST_NAME_LENGTHS:
+        if s[:n] in COMMON_FIRST_NAMES:
+            return s[:n]
+    return ''
+
+
+@lru_cache(maxsize=4096)
 def split_joined_name(name: str) -> str:
     """Tenta separar nomes colados (ex: ALDENIRLUIZ -> ALDENIR LUIZ) usando uma lista de primeiros nomes.
 
@@ -120,25 +190,26 @@ def split_joined_name(name: str) -> str:
 
     up = name.upper()
     # procura por partições possíveis
-    for fn in COMMON_FIRST_NAMES:
-        if up.startswith(fn):
-            rest = up[len(fn):]
-            # tenta encontrar outro first name no início do restante
-            for fn2 in COMMON_FIRST_NAMES:
-                if rest.startswith(fn2):
-                    return (fn + ' ' + fn2).title()
-            # se não encontrou, tenta partir em duas metades razoáveis
-            if 3 <= len(rest) <= 12:
-                return (fn + ' ' + rest).title()
+    fn = _first_name_prefix(up)
+    if fn:
+        rest = up[len(fn):]
+        # tenta encontrar outro first name no início do restante
+        fn2 = _first_name_prefix(rest)
+        if fn2:
+            return (fn + ' ' + fn2).title()
+        # se não encontrou, tenta partir em duas metades razoáveis
+        if 3 <= len(rest) <= 12:
+            return (fn + ' ' + rest).title()
 
     # fallback: tenta inserir espaço entre duas sequências de letras longas
-    m = re.match(r'([A-Z]{3,})([A-Z]{3,})', up)
+    m = _JOIN_RE.match(up)
     if m:
         return (m.group(1) + ' ' + m.group(2)).title()
 
     return name.title()
 
 
+@lru_cache(maxsize=4096)
 def correct_name(raw: str) -> str:
     """Pipeline de correção que aplica limpeza, remoção de cargos e separação de nomes colados."""
     if not raw:
@@ -147,8 +218,8 @@ def correct_name(raw: str) -> str:
     s = clean_ocr_text(raw)
     s = strip_times_and_roles(s)
     # strip stray punctuation/digits
-    s = re.sub(r'[^A-Za-z\s]', ' ', s)
-    s = re.sub(r'\s+', ' ', s).strip()
+    s = _NONALPHA_RE.sub(' ', s)
+    s = _WS_RE.sub(' ', s).strip()
 
     if not s:
         return 'Unknown'
@@ -185,33 +256,29 @@ def parse_time(time_str: str) -> str:
 def parse_line(line: str) -> AttendanceEntry:
     """Parses a single line from the attendance sheet"""
     # Remove multiple spaces and split
-    parts = [p.strip() for p in re.split(r'\s+', line) if p.strip()]
+    parts = line.split()
     
     if len(parts) < 4:  # Skip invalid lines
         return None
         
-    # Extract times (looking for patterns like HH:MM or HHMM)
+    # Single pass: extract times (patterns like HH:MM or HHMM), name and role
+    # (name typically comes first, before the role and times)
     times = []
-    for part in parts:
-        if re.match(r'^([0-2]?\d[:.]?[0-5]\d|F)$', part):
-            times.append(parse_time(part))
-    
-    # Get name and role (typically first parts before times)
     name_parts = []
     role_parts = []
     found_role = False
     
     for part in parts:
-        if not re.match(r'^([0-2]?\d[:.]?[0-5]\d|F)$', part):
-            if found_role:
-                role_parts.append(part)
-            else:
-                # Common roles that indicate role section started
-                if part.upper() in ['SERVENTE', 'PEDREIRO', 'PINTOR', 'ELETRICISTA']:
-                    found_role = True
-                    role_parts.append(part)
-                else:
-                    name_parts.append(part)
+        if _TIMEPART_RE.match(part):
+            times.append(parse_time(part))
+        elif found_role:
+            role_parts.append(part)
+        # Common roles that indicate role section started
+        elif part.upper() in _ROLE_MARKERS:
+            found_role = True
+            role_parts.append(part)
+        else:
+            name_parts.append(part)
     
     name = ' '.join(name_parts)
     role = ' '.join(role_parts)
@@ -232,17 +299,28 @@ def parse_line(line: str) -> AttendanceEntry:
 
 def parse_attendance_data(text: str) -> Dict[str, Any]:
     """Parses the complete attendance sheet"""
+    roster = _get_roster()
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
     entries: List[AttendanceEntry] = []
+    absent = 0
     
+    # Filter out invalid lines and count absences in the same pass
     for line in lines:
         entry = parse_line(line)
         if entry:
             entries.append(entry)
+            absent += entry.is_absent
+
+    # Correspondência com o roster: nomes corrigidos (sem repetição) pontuados numa única chamada em lote
+    if roster and roster.names:
+        corrected = [correct_name(e.name) for e in entries]
+        unique = list(dict.fromkeys(corrected))
+        matches = dict(zip(unique, match_all_to_roster(unique, roster)))
+        for entry, name in zip(entries, corrected):
+            entry.canonical_name, entry.match_score = matches[name]
     
     # Count attendance
-    present = sum(1 for e in entries if not e.is_absent)
-    absent = sum(1 for e in entries if e.is_absent)
+    present = len(entries) - absent
     
     return {
         "date": datetime.now().strftime("%Y-%m-%d"),
@@ -1,16 +1,25 @@
+import os
 from pathlib import Path
 import cv2
 import numpy as np
 
+cv2.setNumThreads(os.cpu_count() or 1)
+
+# Largura de uma folha A4 a ~300 DPI; o custo do LSTM do Tesseract cresce com o número de pixels
+TARGET_WIDTH = 2480
+# Faixa plausível da fração de pixels de tinta após a binarização global (Otsu)
+MIN_INK_RATIO = 0.02
+MAX_INK_RATIO = 0.40
+
 def preprocess_image(image_path):
     """
     Carrega a imagem e aplica filtros para melhorar OCR:
     - leitura segura
     - conversão para cinza
-    - desruído
-    - binarização adaptativa
-    - pequena abertura para remover pontos
-    Retorna imagem pronta para pytesseract.
+    - normalização para ~300 DPI (reduz scans enormes, amplia fotos pequenas)
+    - desruído (blur gaussiano)
+    - binarização por Otsu (adaptativa se o resultado for implausível)
+    Retorna imagem pronta para o Tesseract.
     """
     p = Path(image_path)
     if not p.exists():
@@ -20,16 +29,26 @@ def preprocess_image(image_path):
     if img is None:
         raise ValueError(f"Falha ao ler a imagem: {p}")
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    denoised = cv2.bilateralFilter(gray, d=9, sigmaColor=75, sigmaSpace=75)
-    # adaptive threshold (invertido se marcar com X/pontos for escuro)
-    thresh = cv2.adaptiveThreshold(denoised, 255,
-                                   cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                   cv2.THRESH_BINARY, 5, 9)
-    # opcional: remoção de ruído pequeno
-    kernel = np.ones((2,2), np.uint8)
-    opened = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-    
+    gray = np.empty(img.shape[:2], np.uint8)
+    cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
+    w = gray.shape[1]
+    if w > TARGET_WIDTH or w < TARGET_WIDTH // 2:
+        scale = TARGET_WIDTH / w
+        interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interp)
+    # blur gaussiano no próprio buffer: bem mais barato que o bilateralFilter e suficiente para binarizar
+    cv2.GaussianBlur(gray, (5, 5), 0, dst=gray)
+    # Otsu: um único histograma, suficiente para folhas com iluminação uniforme
+    thresh = np.empty_like(gray)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=thresh)
+    # com THRESH_BINARY o texto escuro vira 0, então a tinta é tudo que não é branco
+    ink = 1.0 - cv2.countNonZero(thresh) / thresh.size
+    if not MIN_INK_RATIO <= ink <= MAX_INK_RATIO:
+        # iluminação irregular (sombras, fotos): adaptive threshold (invertido se marcar com X/pontos for escuro)
+        cv2.adaptiveThreshold(gray, 255,
+                              cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, 5, 9, dst=thresh)
+
     return thresh
 
 
@@ -1,5 +1,6 @@
 from pathlib import Path
-import csv
+import os
+import sys
 from datetime import datetime
 
 def generate_report(data: dict, out_path: str = None):
@@ -13,14 +14,19 @@ def generate_report(data: dict, out_path: str = None):
         out_dir.mkdir(parents=True, exist_ok=True)
         out_path = out_dir.joinpath(f'attendance_summary_{datetime.now():%Y%m%d_%H%M%S}.csv')
 
-    with open(out_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['present', 'absent', 'total'])
-        writer.writerow([present, absent, total])
+    # apenas duas linhas numéricas: monta o CSV (mesmo formato do csv.writer) e grava numa única escrita
+    payload = f"present,absent,total\r\n{present},{absent},{total}\r\n".encode('utf-8')
+    fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
 
-    print("Relatório de Presença")
-    print("---------------------")
-    print(f"Presentes: {present}")
-    print(f"Ausentes : {absent}")
-    print(f"Total    : {total}")
-    print(f"Relatório salvo em: {out_path}")
\ No newline at end of file
+    sys.stdout.write(
+        "Relatório de Presença\n"
+        "---------------------\n"
+        f"Presentes: {present}\n"
+        f"Ausentes : {absent}\n"
+        f"Total    : {total}\n"
+        f"Relatório salvo em: {out_path}\n"
+    )
\ No newline at end of file
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip('hyperscan')
+
+from generate_roster import SAMPLE
+from parser import HAS_HYPERSCAN, _SCRUB_RE, _hs_scrub, clean_ocr_text
+
+
+def _ascii_lines():
+    for raw in SAMPLE.splitlines():
+        # linhas cruas e já limpas (o que strip_times_and_roles recebe), nas duas caixas
+        for line in (raw, clean_ocr_text(raw), raw.upper(), raw.lower()):
+            if line.isascii():
+                yield line
+
+
+def test_hyperscan_database_compiled():
+    assert HAS_HYPERSCAN
+
+
+@pytest.mark.parametrize('line', list(_ascii_lines()))
+def test_hs_scrub_matches_scrub_re(line):
+    assert _hs_scrub(line) == _SCRUB_RE.sub(' ', line)
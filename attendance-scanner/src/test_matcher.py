@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip('rapidfuzz')
+
+from matcher import load_roster, match_all_to_roster, match_to_roster
+
+ROSTER_NAMES = [
+    'Adriano Dantas',
+    'Francisco Erinaldo e Silva',
+    'Francisco Ferreira Neto',
+    'Francisco Silvestre da Silva Filho',
+    'Jefferson Alves',
+    'Jose Alexandre da Silva',
+    'Jose Mariano de Medeiros Neto',
+    'Jose Paulino dos Santos',
+    'Railson Absolon Varela',
+    'Renato Renato',
+]
+
+
+@pytest.fixture
+def roster(tmp_path):
+    p = tmp_path / 'roster.csv'
+    p.write_text('canonical_name,aliases,role\n' + ''.join(f'"{n}",,\n' for n in ROSTER_NAMES),
+                 encoding='utf-8')
+    return load_roster(str(p))
+
+
+def test_match_all_to_roster_agrees_with_match_to_roster(roster):
+    names = ['Railson Absolon Varela Ravengar', 'Jefersom Alves Jefersom',
+             'Ifrancisco Silvestre Silva Filho', 'Renato Renato', 'Zebedeu Quaresma', '']
+    assert match_all_to_roster(names, roster) == [match_to_roster(n, roster) for n in names]
+
+
+# linhas de OCR que trazem a coluna de apelido (ou cortam o sobrenome) e ficam fora da janela de tamanho
+@pytest.mark.parametrize('ocr_name, expected', [
+    ('Railson Absolon Varela Ravengar', 'Railson Absolon Varela'),
+    ('Francisco Silvestre', 'Francisco Silvestre da Silva Filho'),
+    ('Jefersom Alves Jefersom', 'Jefferson Alves'),
+    ('Jose Mariano Me Be', 'Jose Mariano de Medeiros Neto'),
+    ('Ifrancisco Silvestre Silva Filho', 'Francisco Silvestre da Silva Filho'),
+])
+def test_match_to_roster_recall(roster, ocr_name, expected):
+    canonical, score = match_to_roster(ocr_name, roster)
+    assert canonical == expected
+    assert score >= 85
+
+
+def test_match_to_roster_reports_best_score_below_threshold(roster):
+    canonical, score = match_to_roster('Zebedeu Quaresma', roster)
+    assert canonical is None
+    assert score is not None and score < 85